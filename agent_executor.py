@@ -2,7 +2,7 @@
 import asyncio
 from typing import Dict, Any
 import logging
-import traceback
+import sys
 import streamlit as st
 from agents import Agent
 from tools import ToolRegistry
@@ -14,34 +14,25 @@ DEBUG = False
 
 
 def debug_log(msg: str, data: Any = None):
-    if DEBUG:
-        call_frame = traceback.extract_stack()[-2]
-        calling_func = call_frame.name
-        if data:
-            logger.debug(f"[{calling_func}] {msg} | Data: {data}")
-        else:
-            logger.debug(f"[{calling_func}] {msg}")
+    if not DEBUG or not logger.isEnabledFor(logging.DEBUG):
+        return
+    calling_func = sys._getframe(1).f_code.co_name
+    if data:
+        logger.debug("[%s] %s | Data: %s", calling_func, msg, data)
+    else:
+        logger.debug("[%s] %s", calling_func, msg)
 
 
 async def execute_agent(agent_instance: Agent):
-    """Execute the agent with proper error handling and timeout"""
+    """Execute the agent with proper error handling; the caller owns the timeout"""
     debug_log(f"Executing agent: {agent_instance.name}")
     try:
-        await asyncio.wait_for(
-            agent_instance.execute(),
-            timeout=30
-        )
+        await agent_instance.execute()
 
         debug_log(f"Agent {agent_instance.name} completed successfully")
         show_agent_status(agent_instance.name, "completed", 1.0)
         add_message("system", f"Agent {agent_instance.name} completed successfully")
 
-    except asyncio.TimeoutError:
-        debug_log(f"Agent {agent_instance.name} execution timed out")
-        show_agent_status(agent_instance.name, "timeout", 0.0)
-        add_message("system", f"Agent {agent_instance.name} timed out")
-        raise
-
     except Exception as e:
         debug_log(f"Agent {agent_instance.name} execution failed: {str(e)}")
         show_agent_status(agent_instance.name, "failed", 0.0)
@@ -53,14 +44,8 @@ async def process_agent(agent_data: Dict, tool_registry: ToolRegistry, state_man
     """Process a single agent with proper event loop handling"""
     debug_log(f"Processing agent: {agent_data['name']}")
     try:
-        agent_instance = Agent(
-            name=agent_data["name"],
-            description=agent_data["description"],
-            tools=agent_data["tools"],
-            initial_step=agent_data["initial_step"],
-            steps=agent_data["steps"],
-            final_step=agent_data["final_step"],
-            exception_handling=agent_data["exception_handling"],
+        agent_instance = Agent.from_dict(
+            agent_data,
             user_id=st.session_state.user_id,
             tool_registry=tool_registry,
             state_manager=state_manager
@@ -69,10 +54,8 @@ async def process_agent(agent_data: Dict, tool_registry: ToolRegistry, state_man
         await agent_instance.initialize_state()
         show_agent_status(agent_data["name"], "Starting", 0.0)
 
-        await asyncio.wait_for(
-            execute_agent(agent_instance),
-            timeout=30
-        )
+        async with asyncio.timeout(30):
+            await execute_agent(agent_instance)
 
     except asyncio.TimeoutError:
         show_agent_status(agent_data["name"], "timeout", 0.0)
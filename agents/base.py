@@ -1,7 +1,9 @@
 # agents/base.py
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterable, Awaitable
 from datetime import datetime
 import asyncio
+from contextlib import nullcontext
+from itertools import chain
 import logging
 from dataclasses import dataclass, asdict
 import json
@@ -10,7 +12,38 @@ from .messaging import MessageQueue, AgentMessage
 
 logger = logging.getLogger(__name__)
 
+async def _capture(coro: Awaitable[Any]) -> Any:
+    """Await a coroutine, returning its exception instead of raising it"""
+    try:
+        return await coro
+    except Exception as e:
+        return e
+
+async def run_concurrently(coros: Iterable[Awaitable[Any]]) -> List[Any]:
+    """Run coroutines in a TaskGroup and return results in input order.
+    
+    Like gather(return_exceptions=True), a failing coroutine yields its
+    exception instead of cancelling its siblings, while cancelling the
+    caller still cancels every child task.
+    """
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(_capture(coro)) for coro in coros]
+    return [task.result() for task in tasks]
+
 class Agent:
+    __slots__ = (
+        'name', 'description', 'tools', 'initial_step', 'steps', 'final_step',
+        'exception_handling', 'user_id', 'tool_registry', 'state_manager',
+        'tool_semaphore', 'message_queue',
+        '_status', '_current_step', '_initial_state'
+    )
+    
+    # Fields of a serialized agent definition, as produced by AgentGenerator
+    _DICT_KEYS = (
+        'name', 'description', 'tools', 'initial_step',
+        'steps', 'final_step', 'exception_handling'
+    )
+    
     def __init__(
         self,
         name: str,
@@ -23,7 +56,8 @@ class Agent:
         user_id: str,
         tool_registry: 'ToolRegistry',
         state_manager: 'StateManager',
-        message_queue: Optional[MessageQueue] = None
+        message_queue: Optional[MessageQueue] = None,
+        tool_semaphore: Optional[asyncio.Semaphore] = None
     ):
         self.name = name
         self.description = description
@@ -36,16 +70,26 @@ class Agent:
         self.tool_registry = tool_registry
         self.state_manager = state_manager
         
+        # Optional limit on tool calls in flight, shared across agents
+        self.tool_semaphore = tool_semaphore
+        
         # Initialize messaging
         self.message_queue = message_queue or MessageQueue()
         self._status = "initialized"
         self._current_step = None
-      
-        # Subscribe to messages
-        self.message_queue.subscribe(self.name, self._handle_message)
+        self._initial_state = None
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], **context) -> 'Agent':
+        """Create an agent from a serialized definition plus runtime context
+        (user_id, tool_registry, state_manager, ...)"""
+        return cls(**{key: data[key] for key in cls._DICT_KEYS}, **context)
     
     async def initialize_state(self):
-        """Initialize agent state"""
+        """Initialize agent state; repeated calls return the same state"""
+        if self._initial_state is not None:
+            return self._initial_state
+        
         state = await self.state_manager.create_state(
             agent_id=self.name,
             user_id=self.user_id,
@@ -56,6 +100,7 @@ class Agent:
             status="initialized",
             step_results={}
         )
+        self._initial_state = state
         return state
 
     async def _handle_message(self, message: AgentMessage):
@@ -78,17 +123,21 @@ class Agent:
         """Execute agent's workflow"""
         state = None
         try:
-            # Initialize state
-            state = await self.initialize_state()
+            # Reuse the state created by a prior initialize_state() call
+            state = self._initial_state or await self.initialize_state()
             self._status = "running"
             await self._update_state_status(state, "running")
             
+            # Subscribe only while executing; agents built just to be
+            # serialized never touch the queue
+            self.message_queue.subscribe(self.name, self._handle_message)
+            
             # Start message queue if not already running
             if not self.message_queue._running:
                 await self.message_queue.start()
             
             # Execute steps
-            steps = [self.initial_step] + self.steps + [self.final_step]
+            steps = chain((self.initial_step,), self.steps, (self.final_step,))
             for step in steps:
                 if self._status == "stopped":
                     logger.info(f"Agent {self.name} stopped during execution")
@@ -120,44 +169,50 @@ class Agent:
         """Execute a single step using available tools"""
         try:
             self._current_step = step
-            await self._update_state_status(state, "running", current_step=step)
+            state.current_step = step
+            state.status = "running"
             
-            # Execute each tool
-            step_results = {}
+            # Resolve tools and prepare their parameters
+            tool_calls = []
             for tool_name in self.tools:
                 tool = self.tool_registry.get_tool(tool_name)
                 if not tool:
                     logger.warning(f"Tool {tool_name} not found in registry")
                     continue
                 
-                try:
-                    # Prepare tool parameters
-                    params = {
-                        "step": step,
-                        "user_id": self.user_id,
-                        "query": f"Execute {step} step",
-                        "current_state": state.tools_state.get(tool_name, {}),
-                        "shared_data": state.shared_data,
-                        "input_data": state.step_results
-                    }
-                    
-                    # Execute tool
-                    result = await tool.safe_execute(params)
-                    step_results[tool_name] = result
-                    
-                    # Update tool state
-                    if result.get("state"):
-                        state.tools_state[tool_name] = result["state"]
-                    
-                except Exception as e:
-                    logger.error(f"Tool {tool_name} execution failed: {str(e)}")
+                params = {
+                    "step": step,
+                    "user_id": self.user_id,
+                    "query": f"Execute {step} step",
+                    "current_state": state.tools_state.get(tool_name, {}),
+                    "shared_data": state.shared_data,
+                    "input_data": state.step_results
+                }
+                tool_calls.append((tool_name, tool, params))
+            
+            # Execute tools concurrently; they are independent within a step
+            results = await run_concurrently(
+                self._call_tool(tool, params) for _, tool, params in tool_calls
+            )
+            
+            step_results = {}
+            for (tool_name, _, _), result in zip(tool_calls, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Tool {tool_name} execution failed: {str(result)}")
                     if self.exception_handling.get("continue_on_error", False):
-                        step_results[tool_name] = {"error": str(e)}
-                    else:
-                        raise
+                        step_results[tool_name] = {"error": str(result)}
+                        continue
+                    raise result
+                
+                step_results[tool_name] = result
+                
+                # Update tool state
+                if result.get("state"):
+                    state.tools_state[tool_name] = result["state"]
             
             # Store step results
             state.step_results[step] = step_results
+            state.last_updated = datetime.now()
             await self.state_manager.update_state(state)
             
             # Send progress message
@@ -169,6 +224,11 @@ class Agent:
             logger.error(f"Step {step} execution failed: {str(e)}")
             raise
 
+    async def _call_tool(self, tool, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a tool, respecting the shared tool concurrency limit"""
+        async with self.tool_semaphore or nullcontext():
+            return await tool.safe_execute(params)
+
     async def _send_progress_message(self, step: str, results: Dict[str, Any]):
         """Send progress message"""
         if self.message_queue._running:
@@ -180,10 +240,9 @@ class Agent:
                     "status": "completed",
                     "results": results
                 },
-                message_type="progress_update",
-                timestamp=datetime.now()
+                message_type="progress_update"
             )
-            await self.message_queue.send(message)
+            await self.message_queue.send_direct(message)
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert agent to dictionary representation"""
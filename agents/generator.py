@@ -1,12 +1,16 @@
 # agents/generator.py
-from typing import Dict, List, Any, Optional
-import json
+from typing import Dict, List, Any, Optional, Tuple
+import asyncio
 from datetime import datetime
 import logging
+from operator import attrgetter
+import sys
+import threading
 import traceback
 
-from config import llm  # Import configured LLM from config
-from .base import Agent
+import json_utils
+from config import get_llm, WORKFLOW_CONFIG  # Import configured LLM from config
+from .base import Agent, run_concurrently
 from state.state_manager import StateManager
 from tools.registry import ToolRegistry
 
@@ -14,15 +18,30 @@ from tools.registry import ToolRegistry
 logger = logging.getLogger(__name__)
 DEBUG = True  # Global debug flag
 
+def _dumps_debug(data: Any) -> str:
+    """Serialize debug payloads"""
+    return json_utils.dumps(data, indent=True, default=str)
+
 def debug_log(msg: str, data: Any = None):
     """Utility function for debug logging"""
-    if DEBUG:
-        call_frame = traceback.extract_stack()[-2]  # Get calling frame
-        calling_func = call_frame.name
-        if data:
-            logger.debug(f"[{calling_func}] {msg} | Data: {json.dumps(data, default=str, indent=2)}")
-        else:
-            logger.debug(f"[{calling_func}] {msg}")
+    # Bail out before any frame inspection or serialization when disabled
+    if not DEBUG or not logger.isEnabledFor(logging.DEBUG):
+        return
+    calling_func = sys._getframe(1).f_code.co_name  # Get calling frame
+    if data:
+        logger.debug("[%s] %s | Data: %s", calling_func, msg, _dumps_debug(data))
+    else:
+        logger.debug("[%s] %s", calling_func, msg)
+
+# Fields every generated agent definition must provide
+_REQUIRED_FIELDS = frozenset({
+    "name", "description", "tools", "initial_step",
+    "steps", "final_step", "exception_handling"
+})
+
+# Agent attributes serialized into the generated rules, in output order
+_AGENT_KEYS = Agent._DICT_KEYS
+_AGENT_PROJ = attrgetter(*_AGENT_KEYS)
 
 class AgentGenerator:
     """Generates and manages agents based on problem descriptions"""
@@ -44,9 +63,24 @@ class AgentGenerator:
         tool_list = self.tool_registry.list_tools()
         debug_log("Raw tool list", tool_list)
         
-        self.available_tools = tool_list if isinstance(tool_list, list) else []
+        self.available_tools = list(tool_list) if isinstance(tool_list, (list, tuple)) else []
         debug_log("Processed available tools", self.available_tools)
         
+        # Tool names used for O(1) membership checks during validation
+        self._available_tool_set = frozenset(str(t) for t in self.available_tools)
+        # Tool list as it appears in the rule generation prompt
+        self._tools_str = ", ".join(map(str, self.available_tools))
+        
+        # Shared limits on concurrent agent runs and tool calls, so parallel
+        # fan-out does not thrash LLM and tool rate limits
+        self._sem = asyncio.Semaphore(WORKFLOW_CONFIG["max_concurrent_tasks"])
+        self._tool_sem = asyncio.Semaphore(WORKFLOW_CONFIG["max_concurrent_tools"])
+        
+        # Agents built by the last generate_rules call and the rules dict
+        # they belong to, so execute_agents can skip reconstructing them
+        self._last_rules: Optional[Dict] = None
+        self._last_instances: List[Agent] = []
+        
         logger.info(f"AgentGenerator initialized with {len(self.available_tools)} tools")
     
     async def generate_rules(self, problem_description: str) -> Dict:
@@ -71,14 +105,14 @@ class AgentGenerator:
         debug_log("Formatting prompt template")
         formatted_prompt = prompt_template.format(
             problem_description=problem_description,
-            available_tools=", ".join(str(tool) for tool in self.available_tools)
+            available_tools=self._tools_str
         )
         debug_log("Formatted prompt", formatted_prompt)
 
         try:
             debug_log("Sending request to LLM")
             # Get response from LLM
-            response = llm.complete(formatted_prompt)
+            response = get_llm().complete(formatted_prompt)
             response_text = response.text if hasattr(response, 'text') else str(response)
             debug_log("Raw LLM response", response_text)
             
@@ -100,18 +134,12 @@ class AgentGenerator:
             result = {
                 "problem": problem_description,
                 "agents": [
-                    {
-                        "name": agent.name,
-                        "description": agent.description,
-                        "tools": agent.tools,
-                        "initial_step": agent.initial_step,
-                        "steps": agent.steps,
-                        "final_step": agent.final_step,
-                        "exception_handling": agent.exception_handling
-                    }
+                    dict(zip(_AGENT_KEYS, _AGENT_PROJ(agent)))
                     for agent in agents
                 ]
             }
+            self._last_rules = result
+            self._last_instances = agents
             debug_log("Final result", result)
             return result
 
@@ -124,30 +152,24 @@ class AgentGenerator:
         """Clean the LLM response text to extract valid JSON"""
         debug_log("Cleaning response text", {"input": text})
         
-        text = text.strip()
-        debug_log("After stripping", {"text": text})
-        
-        if not text.startswith('{'):
-            start_idx = text.find('{')
-            if start_idx != -1:
-                text = text[start_idx:]
-                debug_log("Found JSON start", {"start_index": start_idx, "text": text})
+        # Keep everything from the first '{' to the last '}'
+        start = text.find('{')
+        end = text.rfind('}') + 1
+        if start != -1 and end > start:
+            debug_log("Found JSON object", {"start_index": start, "end_index": end})
+            return text[start:end]
         
-        end_idx = text.rfind('}')
-        if end_idx != -1:
-            text = text[:end_idx + 1]
-            debug_log("Found JSON end", {"end_index": end_idx, "text": text})
-            
-        return text
+        debug_log("No JSON object found")
+        return text.strip()
 
     def _parse_json(self, text: str) -> Dict:
         """Parse and validate JSON response"""
         debug_log("Parsing JSON text", {"text": text})
         try:
-            parsed = json.loads(text)
+            parsed = json_utils.loads(text)
             debug_log("Successfully parsed JSON", parsed)
             return parsed
-        except json.JSONDecodeError as e:
+        except json_utils.JSONDecodeError as e:
             error_msg = f"Failed to parse JSON. Response text: {text}"
             logger.error(f"{error_msg}\n{traceback.format_exc()}")
             raise ValueError(f"Invalid JSON response: {str(e)}")
@@ -178,16 +200,8 @@ class AgentGenerator:
         """Validate individual agent data"""
         debug_log("Validating agent data", agent_data)
         
-        required_fields = [
-            "name", "description", "tools", "initial_step",
-            "steps", "final_step", "exception_handling"
-        ]
-        
         debug_log("Checking required fields")
-        missing_fields = [
-            field for field in required_fields 
-            if field not in agent_data
-        ]
+        missing_fields = sorted(_REQUIRED_FIELDS - agent_data.keys())
         
         if missing_fields:
             error_msg = f"Missing required fields: {missing_fields}"
@@ -198,7 +212,7 @@ class AgentGenerator:
         debug_log("Validating tools", {"agent_tools": agent_data["tools"], "available_tools": self.available_tools})
         invalid_tools = [
             tool for tool in agent_data["tools"]
-            if str(tool) not in [str(t) for t in self.available_tools]
+            if str(tool) not in self._available_tool_set
         ]
         
         if invalid_tools:
@@ -217,17 +231,12 @@ class AgentGenerator:
             debug_log(f"Creating agent {idx}", agent_data)
             
             try:
-                agent = Agent(
-                    name=agent_data["name"],
-                    description=agent_data["description"],
-                    tools=agent_data["tools"],
-                    initial_step=agent_data["initial_step"],
-                    steps=agent_data["steps"],
-                    final_step=agent_data["final_step"],
-                    exception_handling=agent_data["exception_handling"],
+                agent = Agent.from_dict(
+                    agent_data,
                     user_id=self.user_id,
                     tool_registry=self.tool_registry,
-                    state_manager=self.state_manager
+                    state_manager=self.state_manager,
+                    tool_semaphore=self._tool_sem
                 )
                 
                 # Initialize agent state
@@ -257,35 +266,45 @@ class AgentGenerator:
                 debug_log(error_msg, {"type": type(agents_data)})
                 raise ValueError(error_msg)
             
-            # Create tasks for each agent
-            for idx, agent_data in enumerate(agents_data):
-                debug_log(f"Creating agent {idx}", agent_data)
-                
-                agent = Agent(
-                    name=agent_data["name"],
-                    description=agent_data["description"],
-                    tools=agent_data["tools"],
-                    initial_step=agent_data["initial_step"],
-                    steps=agent_data["steps"],
-                    final_step=agent_data["final_step"],
-                    exception_handling=agent_data["exception_handling"],
-                    user_id=self.user_id,
-                    tool_registry=self.tool_registry,
-                    state_manager=self.state_manager
-                )
-                
-                # Execute agent
-                debug_log(f"Executing agent: {agent.name}")
-                await agent.execute()
-                
-                # Get final state
-                debug_log(f"Getting final state for agent {agent.name}")
-                final_state = await self.state_manager.get_state(
-                    agent.name,
-                    self.user_id
-                )
+            # Reuse the instances built by generate_rules for these rules,
+            # otherwise create an agent instance for each entry
+            agents = self._last_instances if rules_json is self._last_rules else None
+            if agents:
+                debug_log(f"Reusing {len(agents)} agent instances")
+            else:
+                agents = []
+                for idx, agent_data in enumerate(agents_data):
+                    debug_log(f"Creating agent {idx}", agent_data)
+                    
+                    agents.append(Agent.from_dict(
+                        agent_data,
+                        user_id=self.user_id,
+                        tool_registry=self.tool_registry,
+                        state_manager=self.state_manager,
+                        tool_semaphore=self._tool_sem
+                    ))
+            
+            # Execute agents concurrently, capping fan-out to the LLM
+            async def run_agent(agent: Agent):
+                async with self._sem:
+                    debug_log(f"Executing agent: {agent.name}")
+                    await agent.execute()
+            
+            results = await run_concurrently(run_agent(agent) for agent in agents)
+            
+            # Get final states
+            debug_log("Getting final states for agents")
+            final_states = await run_concurrently(
+                self.state_manager.get_state(agent.name, self.user_id) for agent in agents
+            )
+            
+            for agent, result, final_state in zip(agents, results, final_states):
+                if isinstance(result, Exception):
+                    logger.error(f"Agent {agent.name} execution failed: {str(result)}")
                 
-                if final_state:
+                if isinstance(final_state, Exception):
+                    logger.error(f"Failed to get final state for agent {agent.name}: {str(final_state)}")
+                elif final_state:
                     debug_log(f"Agent {agent.name} final state", {
                         "status": final_state.status,
                         "current_step": final_state.current_step,
@@ -306,6 +325,22 @@ class AgentGenerator:
             logger.error(f"{error_msg}\n{traceback.format_exc()}")
             raise
 
+# System components shared by run_agent_system calls on the same thread.
+# The state manager's in-memory buffers are only safe within one thread,
+# and run_async gives each thread its own event loop, so components are
+# cached per thread rather than per process.
+_components = threading.local()
+
+async def _get_components() -> Tuple[ToolRegistry, StateManager]:
+    """Return this thread's tool registry and state manager, creating them once"""
+    components = getattr(_components, "value", None)
+    if components is None:
+        # No await between the check and the store, so no lock is needed
+        tool_registry = ToolRegistry()
+        tool_registry.freeze()
+        components = _components.value = (tool_registry, StateManager("agents.db"))
+    return components
+
 # Example usage:
 async def run_agent_system(problem_description: str, user_id: str):
     """Run the complete agent system"""
@@ -314,10 +349,9 @@ async def run_agent_system(problem_description: str, user_id: str):
     })
     
     try:
-        # Initialize components
-        debug_log("Initializing system components")
-        tool_registry = ToolRegistry()
-        state_manager = StateManager("agents.db")
+        # Get shared components
+        debug_log("Getting system components")
+        tool_registry, state_manager = await _get_components()
         
         # Create agent generator
         debug_log("Creating AgentGenerator")
@@ -1,33 +1,53 @@
 # agents/messaging.py
-from dataclasses import dataclass
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Any, Optional, Callable, Awaitable
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from itertools import count
 import asyncio
-import uuid
+import os
 import logging
 from contextlib import asynccontextmanager
+from config import WORKFLOW_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# Message ids only need to be unique, not random: a per-process counter
+# prefixed with the pid is far cheaper than formatting a uuid4
+_MESSAGE_ID_PREFIX = f"m{os.getpid():x}-"
+_message_counter = count()
 
-@dataclass
+
+@dataclass(slots=True)
 class AgentMessage:
     sender: str
     receiver: str
     content: Dict[str, Any]
     message_type: str
-    timestamp: datetime
+    timestamp: datetime = field(default_factory=datetime.now)
     message_id: str = None
 
     def __post_init__(self):
         if self.message_id is None:
-            self.message_id = str(uuid.uuid4())
+            self.message_id = f"{_MESSAGE_ID_PREFIX}{next(_message_counter):x}"
 
 
 class MessageQueue:
-    def __init__(self):
-        self._queue = asyncio.Queue()
+    def __init__(self, maxsize: Optional[int] = None):
+        # Single-consumer FIFO: a plain deque plus an event to wake the
+        # consumer avoids asyncio.Queue's per-operation waiter bookkeeping
+        self._deque: deque = deque()
+        # Bound on queued messages; 0 or less means unbounded
+        self._maxsize = WORKFLOW_CONFIG.get("queue_max", 10000) if maxsize is None else maxsize
+        self._data_event = asyncio.Event()
+        # Set while there is room in the queue
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        # Set while nothing is queued or being dispatched
+        self._idle = asyncio.Event()
+        self._idle.set()
         self._subscribers: Dict[str, Callable[[AgentMessage], Awaitable[None]]] = {}
+        self._batch_subscribers: Dict[str, Callable[[List[AgentMessage]], Awaitable[None]]] = {}
         self._running = False
         self._lock = asyncio.Lock()
 
@@ -39,7 +59,9 @@ class MessageQueue:
 
             self._running = True
             logger.info("Message queue started")
-            await self._process_messages()  # Await directly for sequential execution
+
+        # Process outside the lock so stop() can acquire it and end the loop
+        await self._process_messages()  # Await directly for sequential execution
 
     async def stop(self):
         """Stop message processing"""
@@ -49,72 +71,165 @@ class MessageQueue:
 
             self._running = False
 
-            # Clear queue
-            while not self._queue.empty():
-                try:
-                    self._queue.get_nowait()
-                    self._queue.task_done()
-                except asyncio.QueueEmpty:
-                    break
+            # Clear queue and wake the consumer so it can exit
+            self._deque.clear()
+            self._idle.set()
+            self._data_event.set()
+            self._not_full.set()
 
             logger.info("Message queue stopped")
 
+    def _full(self) -> bool:
+        return 0 < self._maxsize <= len(self._deque)
+
+    def _enqueue(self, message: AgentMessage):
+        self._deque.append(message)
+        self._idle.clear()
+        self._data_event.set()
+        logger.debug("Message queued: %s from %s", message.message_type, message.sender)
+
     async def send(self, message: AgentMessage):
-        """Send a message to the queue"""
+        """Send a message to the queue.
+
+        Applies backpressure: while the queue holds maxsize messages the
+        sender waits until the consumer drains it.
+        """
+        if not self._running:
+            logger.warning("Attempting to send message while queue is not running")
+            return
+
+        while self._full():
+            self._not_full.clear()
+            await self._not_full.wait()
+            if not self._running:
+                return
+
+        self._enqueue(message)
+
+    def try_send(self, message: AgentMessage) -> bool:
+        """Queue a message without waiting.
+
+        Returns False, dropping the message, when the queue is full or not
+        running, so callers can shed load instead of blocking.
+        """
+        if not self._running or self._full():
+            return False
+
+        self._enqueue(message)
+        return True
+
+    async def send_direct(self, message: AgentMessage):
+        """Deliver a message by calling the receiver's callback in place.
+
+        Falls back to the queue when the receiver has no subscriber or
+        earlier messages are still queued or being dispatched, so delivery
+        order is preserved.
+        """
         if not self._running:
             logger.warning("Attempting to send message while queue is not running")
             return
 
-        await self._queue.put(message)
-        logger.debug(f"Message queued: {message.message_type} from {message.sender}")
+        callback = self._subscribers.get(message.receiver)
+        if callback is None or not self._idle.is_set():
+            await self.send(message)
+            return
+
+        try:
+            await callback(message)
+        except Exception as e:
+            logger.error("Error processing message %s: %s", message.message_id, e)
 
     def subscribe(self, receiver: str, callback: Callable[[AgentMessage], Awaitable[None]]):
         """Subscribe to messages"""
+        self._batch_subscribers.pop(receiver, None)
         self._subscribers[receiver] = callback
-        logger.debug(f"Subscribed: {receiver}")
+        logger.debug("Subscribed: %s", receiver)
+
+    def subscribe_batch(self, receiver: str, callback: Callable[[List[AgentMessage]], Awaitable[None]]):
+        """Subscribe with a callback that receives all of a batch's messages
+        for the receiver in one call, in send order"""
+        self._subscribers.pop(receiver, None)
+        self._batch_subscribers[receiver] = callback
+        logger.debug("Subscribed (batch): %s", receiver)
 
     def unsubscribe(self, receiver: str):
         """Unsubscribe from messages"""
-        if receiver in self._subscribers:
-            del self._subscribers[receiver]
-            logger.debug(f"Unsubscribed: {receiver}")
+        removed = self._subscribers.pop(receiver, None)
+        removed_batch = self._batch_subscribers.pop(receiver, None)
+        if removed or removed_batch:
+            logger.debug("Unsubscribed: %s", receiver)
 
     async def _process_messages(self):
-        """Process messages from the queue sequentially"""
+        """Process messages from the queue in batches"""
+        # Hoist attribute lookups out of the loop
+        pending = self._deque
+        data_event = self._data_event
+        idle = self._idle
+        not_full = self._not_full
+        dispatch = self._dispatch_batch
+
         while self._running:
-            try:
-                message = await self._queue.get()
+            if not pending:
+                data_event.clear()
+                await data_event.wait()
+                continue
 
-                try:
-                    # Get subscriber callback
-                    callback = self._subscribers.get(message.receiver)
-                    if callback:
-                        try:
-                            await callback(message)
-                        except Exception as e:
-                            logger.error(
-                                f"Error processing message {message.message_id}: {str(e)}"
-                            )
-                    else:
-                        logger.warning(
-                            f"No subscriber found for message to {message.receiver}"
-                        )
-
-                finally:
-                    self._queue.task_done()
-
-            except asyncio.CancelledError:
-                break
+            # Drain everything queued so far in one go
+            idle.clear()
+            batch = list(pending)
+            pending.clear()
+            not_full.set()
+            # Only dispatch can raise; CancelledError is a BaseException
+            # and propagates past this handler to the caller
+            try:
+                await dispatch(batch)
             except Exception as e:
-                logger.error(f"Message processing error: {str(e)}")
-                # Continue processing next message
+                logger.error("Message processing error: %s", e)
+            finally:
+                if not pending:
+                    idle.set()
+
+    async def _dispatch_batch(self, batch: List[AgentMessage]):
+        """Deliver a batch, looking up each receiver's callback once"""
+        groups: Dict[str, List[AgentMessage]] = defaultdict(list)
+        for message in batch:
+            groups[message.receiver].append(message)
+
+        subscribers_get = self._subscribers.get
+        batch_subscribers_get = self._batch_subscribers.get
+        for receiver, messages in groups.items():
+            batch_callback = batch_subscribers_get(receiver)
+            if batch_callback is not None:
+                try:
+                    await batch_callback(messages)
+                except Exception as e:
+                    logger.error(
+                        "Error processing %d message(s) to %s: %s", len(messages), receiver, e
+                    )
                 continue
 
+            callback = subscribers_get(receiver)
+            if callback is None:
+                logger.warning(
+                    "No subscriber found for %d message(s) to %s", len(messages), receiver
+                )
+                continue
+
+            results = await asyncio.gather(
+                *(callback(message) for message in messages),
+                return_exceptions=True
+            )
+            for message, result in zip(messages, results):
+                if isinstance(result, Exception):
+                    logger.error(
+                        "Error processing message %s: %s", message.message_id, result
+                    )
+
     @property
     def is_running(self) -> bool:
         """Check if queue is running"""
         return self._running
 
     async def wait_until_empty(self):
-        """Wait until queue is empty"""
-        await self._queue.join()
+        """Wait until every queued message has been dispatched"""
+        await self._idle.wait()
@@ -1,11 +1,89 @@
 # agents/rule_based.py
-import json
-from typing import Dict, Any, List, Optional
-from config import llm  # Import configured LLM
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+import json_utils
+from config import get_llm, DEFAULT_MODEL, TOOL_CONFIG, WORKFLOW_CONFIG  # Import configured LLM
 
 # Import required components from agent system
 from . import create_agent, Agent
 
+logger = logging.getLogger(__name__)
+
+# Fields of an agent config in the rules produced by generate_rules
+_AGENT_CONFIG_FIELDS = (
+    "agent_name", "description", "tools", "initial_step",
+    "steps", "final_step", "exception_handling"
+)
+
+# Agent fields the LLM returns, mapped to their agent config names
+_FIELD_MAP = {
+    "name": "agent_name",
+    "description": "description",
+    "tools": "tools",
+    "initial_step": "initial_step",
+    "steps": "steps",
+    "final_step": "final_step",
+    "exception_handling": "exception_handling",
+}
+_REQUIRED_AGENT_FIELDS = frozenset(_FIELD_MAP)
+
+# LRU of generated rules: (prompt digest, model) -> (expiry, rules as JSON).
+# Rules are stored serialized so every hit hands out an independent copy.
+_rules_cache: "OrderedDict[Tuple[bytes, str], Tuple[float, str]]" = OrderedDict()
+# Per-key locks so concurrent identical requests share one LLM call
+_rules_locks: Dict[Tuple[bytes, str], asyncio.Lock] = {}
+
+def _rules_cache_key(problem_description: str) -> Tuple[bytes, str]:
+    """Cache key for a prompt; includes the model so switching it invalidates"""
+    digest = hashlib.blake2b(problem_description.encode()).digest()
+    return digest, DEFAULT_MODEL
+
+def _rules_cache_get(key: Tuple[bytes, str]) -> Optional[Dict]:
+    """Return cached rules for key, dropping the entry if it has expired"""
+    if not TOOL_CONFIG["cache_enabled"]:
+        return None
+    entry = _rules_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, payload = entry
+    if expires_at < time.monotonic():
+        del _rules_cache[key]
+        return None
+    _rules_cache.move_to_end(key)
+    return json_utils.loads(payload)
+
+def _rules_cache_put(key: Tuple[bytes, str], rules_json: Dict):
+    """Store rules for key, evicting least recently used entries"""
+    if not TOOL_CONFIG["cache_enabled"]:
+        return
+    expires_at = time.monotonic() + TOOL_CONFIG["cache_ttl_seconds"]
+    _rules_cache[key] = (expires_at, json_utils.dumps(rules_json))
+    _rules_cache.move_to_end(key)
+    while len(_rules_cache) > TOOL_CONFIG["max_cache_size"]:
+        _rules_cache.popitem(last=False)
+
+def _to_agent_config(agent_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map one LLM agent definition onto an agent config"""
+    if not _REQUIRED_AGENT_FIELDS.issubset(agent_data):
+        missing_fields = sorted(_REQUIRED_AGENT_FIELDS.difference(agent_data))
+        raise ValueError(f"Missing required fields in agent data: {missing_fields}")
+
+    agent_config = {new_key: agent_data[old_key] for old_key, new_key in _FIELD_MAP.items()}
+    depends_on = agent_data.get("depends_on") or []
+    if not isinstance(depends_on, list) or not all(isinstance(name, str) for name in depends_on):
+        raise ValueError(
+            f"depends_on of agent {agent_data['name']!r} must be a list of agent names, "
+            f"got {depends_on!r}"
+        )
+    agent_config["depends_on"] = depends_on
+    return agent_config
+
 async def generate_rules(
     problem_description: str,
     user_id: str,
@@ -14,11 +92,34 @@ async def generate_rules(
 ) -> Dict:
     """
     Generates JSON rules using an LLM based on the user's problem description.
+    Results are cached per problem description and model.
     """
-    print(f"Generating rules for problem: {problem_description}")
+    logger.info("Generating rules for problem: %s", problem_description)
+
+    key = _rules_cache_key(problem_description)
+    cached = _rules_cache_get(key)
+    if cached is not None:
+        return cached
+
+    lock = _rules_locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            # Another request may have filled the cache while we waited
+            cached = _rules_cache_get(key)
+            if cached is not None:
+                return cached
+
+            rules_json = await _generate_rules_uncached(problem_description)
+            _rules_cache_put(key, rules_json)
+            return rules_json
+    finally:
+        if not lock.locked() and _rules_locks.get(key) is lock:
+            del _rules_locks[key]
 
-    prompt_template = (
-        "Create a JSON configuration for agents to solve this problem: {problem_description}\n\n"
+async def _generate_rules_uncached(problem_description: str) -> Dict:
+    """Ask the LLM for agent rules and convert them to the rules format"""
+    formatted_prompt = (
+        f"Create a JSON configuration for agents to solve this problem: {problem_description}\n\n"
         "Respond with ONLY a JSON object containing an 'agents' array. Each agent must have:\n"
         "- name: string\n"
         "- description: string\n"
@@ -26,27 +127,21 @@ async def generate_rules(
         "- initial_step: string\n"
         "- steps: array of strings\n"
         "- final_step: string\n"
-        "- exception_handling: object\n\n"
+        "- exception_handling: object\n"
+        "- depends_on: array of names of agents that must finish before this one starts (empty if none)\n\n"
         "Keep the response concise and ensure it's valid JSON format."
     )
 
-    formatted_prompt = prompt_template.format(problem_description=problem_description)
-
     try:
-        response = llm.complete(formatted_prompt)
+        response = get_llm().complete(formatted_prompt)
         response_text = response.text if hasattr(response, 'text') else str(response)
-        response_text = response_text.strip()
-        
-        if not response_text.startswith('{'):
-            start_idx = response_text.find('{')
-            if start_idx != -1:
-                response_text = response_text[start_idx:]
         
-        end_idx = response_text.rfind('}')
-        if end_idx != -1:
-            response_text = response_text[:end_idx + 1]
+        # Keep everything from the first '{' to the last '}'
+        start = response_text.find('{')
+        end = response_text.rfind('}') + 1
+        body = response_text[start:end] if start != -1 and end > start else response_text
 
-        response_json = json.loads(response_text)
+        response_json = json_utils.loads(body)
         
         if not isinstance(response_json, dict):
             raise ValueError("Response is not a dictionary")
@@ -56,36 +151,77 @@ async def generate_rules(
             raise ValueError("No 'agents' array found in response")
 
         # Convert to proper format without creating agents yet
-        rules_json = {
+        return {
             "problem": problem_description,
-            "agents": []
+            "agents": [_to_agent_config(agent_data) for agent_data in agents_data]
         }
-        
-        for agent_data in agents_data:
-            required_fields = ["name", "description", "tools", "initial_step", 
-                             "steps", "final_step", "exception_handling"]
-            missing_fields = [field for field in required_fields if field not in agent_data]
-            if missing_fields:
-                raise ValueError(f"Missing required fields in agent data: {missing_fields}")
-            
-            agent_config = {
-                "agent_name": agent_data["name"],
-                "description": agent_data["description"],
-                "tools": agent_data["tools"],
-                "initial_step": agent_data["initial_step"],
-                "steps": agent_data["steps"],
-                "final_step": agent_data["final_step"],
-                "exception_handling": agent_data["exception_handling"]
-            }
-            rules_json["agents"].append(agent_config)
-        
-        return rules_json
     
     except Exception as e:
         raise Exception(f"Error generating rules: {str(e)}")
 
 # agents/rule_based.py
 
+@dataclass
+class AgentTask:
+    """An agent plus the names of the agents it has to wait for"""
+    agent: Agent
+    dependencies: Set[str] = field(default_factory=set)
+
+    @property
+    def name(self) -> str:
+        return self.agent.name
+
+class TaskDAG:
+    """Runs agents concurrently as soon as their dependencies have completed"""
+
+    def __init__(self, tasks: List[AgentTask], max_concurrent: int):
+        self.tasks: Dict[str, AgentTask] = {}
+        for task in tasks:
+            if task.name in self.tasks:
+                raise ValueError(f"Duplicate agent name: {task.name}")
+            self.tasks[task.name] = task
+
+        for task in self.tasks.values():
+            unknown = task.dependencies - self.tasks.keys()
+            if unknown:
+                raise ValueError(f"Agent {task.name} depends on unknown agents: {sorted(unknown)}")
+
+        self.completed: Set[str] = set()
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    def ready_tasks(self, pending: Dict[str, AgentTask]) -> List[AgentTask]:
+        """Pending tasks whose dependencies have all completed"""
+        return [task for task in pending.values() if task.dependencies <= self.completed]
+
+    async def _run_task(self, task: AgentTask):
+        async with self._semaphore:
+            await task.agent.execute()
+
+    async def execute(self):
+        """Run every task, starting each one as soon as it becomes ready"""
+        pending = dict(self.tasks)
+        running: Dict[asyncio.Task, str] = {}
+        try:
+            while pending or running:
+                for task in self.ready_tasks(pending):
+                    del pending[task.name]
+                    running[asyncio.create_task(self._run_task(task))] = task.name
+
+                if not running:
+                    raise ValueError(f"Dependency cycle between agents: {sorted(pending)}")
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    name = running.pop(finished)
+                    finished.result()  # Propagate agent failures
+                    self.completed.add(name)
+        finally:
+            # On failure, stop agents that are still running
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
 async def execute_agents(
     rules_json: Dict,
     user_id: str,
@@ -97,7 +233,7 @@ async def execute_agents(
     Executes each agent according to the generated JSON rules.
     """
     try:
-        print("\nStarting agent execution based on generated rules...\n")
+        logger.info("Starting agent execution based on generated rules")
         
         agents_data = rules_json.get("agents")
         if not isinstance(agents_data, list):
@@ -106,47 +242,56 @@ async def execute_agents(
         # Get available tools
         available_tools = await tool_registry.get_available_tools()
         
-        agents = []
-        for agent_data in agents_data:
-            # Create agent using the helper function
-            agent = await create_agent(
-                name=agent_data["agent_name"],
-                description=agent_data["description"],
-                tools=agent_data["tools"],
-                user_id=user_id,
-                tool_registry=tool_registry,
-                state_manager=state_manager,
-                message_queue=message_queue,
-                available_tools=available_tools,
-                **{  # Pass these as kwargs
-                    'initial_step': agent_data["initial_step"],
-                    'steps': agent_data["steps"],
-                    'final_step': agent_data["final_step"],
-                    'exception_handling': agent_data["exception_handling"]
-                }
-            )
-            agents.append(agent)
+        # Validate the whole batch before creating anything
+        for idx, agent_data in enumerate(agents_data):
+            missing_fields = [f for f in _AGENT_CONFIG_FIELDS if f not in agent_data]
+            if missing_fields:
+                raise ValueError(f"Agent config {idx} is missing fields: {missing_fields}")
+        
+        # Create agents concurrently using the helper function
+        results = await asyncio.gather(
+            *(
+                create_agent(
+                    name=agent_data["agent_name"],
+                    description=agent_data["description"],
+                    tools=agent_data["tools"],
+                    user_id=user_id,
+                    tool_registry=tool_registry,
+                    state_manager=state_manager,
+                    message_queue=message_queue,
+                    available_tools=available_tools,
+                    **{  # Pass these as kwargs
+                        'initial_step': agent_data["initial_step"],
+                        'steps': agent_data["steps"],
+                        'final_step': agent_data["final_step"],
+                        'exception_handling': agent_data["exception_handling"]
+                    }
+                )
+                for agent_data in agents_data
+            ),
+            return_exceptions=True
+        )
         
-        # Execute all agents
-        for agent in agents:
-            await agent.execute()
+        failures = [
+            (agent_data["agent_name"], result)
+            for agent_data, result in zip(agents_data, results)
+            if isinstance(result, Exception)
+        ]
+        for name, error in failures:
+            logger.error("Failed to create agent %s: %s", name, error)
+        if failures:
+            raise ValueError(f"Failed to create agents: {[name for name, _ in failures]}")
+        agents = list(results)
+        
+        # Execute agents concurrently, respecting their dependencies
+        dag = TaskDAG(
+            [
+                AgentTask(agent, set(agent_data.get("depends_on") or []))
+                for agent, agent_data in zip(agents, agents_data)
+            ],
+            max_concurrent=WORKFLOW_CONFIG["max_concurrent_tasks"]
+        )
+        await dag.execute()
             
     except Exception as e:
         raise Exception(f"Error executing agents: {str(e)}")
-
-agent = await create_agent(
-    name=agent_data["agent_name"],
-    description=agent_data["description"],
-    tools=agent_data["tools"],
-    user_id=user_id,
-    tool_registry=tool_registry,
-    state_manager=state_manager,
-    message_queue=message_queue,
-    available_tools=available_tools,
-    **{  # Pass these as kwargs
-        'initial_step': agent_data["initial_step"],
-        'steps': agent_data["steps"],
-        'final_step': agent_data["final_step"],
-        'exception_handling': agent_data["exception_handling"]
-    }
-)
\ No newline at end of file
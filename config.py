@@ -1,12 +1,16 @@
 # config.py
 
 import os
+import atexit
+import functools
 import logging
+import queue
 import time
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from dotenv import load_dotenv
 
 # Set up logging
@@ -38,11 +42,19 @@ def setup_logging():
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(console_formatter)
     
+    # File and console writes happen on the listener's background thread;
+    # callers only enqueue the record
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    
     # Setup logger
     logger = logging.getLogger(__name__)
     logger.setLevel(logging.INFO)
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.addHandler(QueueHandler(log_queue))
     
     return logger
 
@@ -56,38 +68,42 @@ except Exception as e:
     logger.error(f"Failed to load environment variables: {str(e)}")
     raise
 
-# Import necessary LlamaIndex components
-from llama_index.llms.nvidia import NVIDIA
-from llama_index.llms.openai import OpenAI
-from llama_index.llms.anthropic import Anthropic
-from llama_index.llms.gemini import Gemini
-from llama_index.llms.together import TogetherLLM
-from llama_index.embeddings.nvidia import NVIDIAEmbedding
-from llama_index.embeddings.openai import OpenAIEmbedding
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-
 # Configuration Metrics
+@dataclass(slots=True)
+class ModelStat:
+    init_time_ns: int = 0
+    errors: int = 0
+
 class ConfigMetrics:
+    __slots__ = ("initialization_times", "llm", "embedding", "start_time")
+
     def __init__(self):
-        self.initialization_times: Dict[str, float] = {}
-        self.model_stats: Dict[str, Dict[str, Any]] = {
-            "llm": {"initialization_time": 0, "errors": 0},
-            "embedding": {"initialization_time": 0, "errors": 0}
-        }
-        self.start_time = time.time()
+        # Durations and timestamps are integer nanoseconds from the
+        # monotonic clock; get_metrics() converts them to seconds
+        self.initialization_times: Dict[str, int] = {}
+        # One stat per model type, named after it ("llm", "embedding")
+        self.llm = ModelStat()
+        self.embedding = ModelStat()
+        self.start_time = time.monotonic_ns()
 
-    def record_initialization(self, model_type: str, duration: float):
-        self.initialization_times[model_type] = duration
-        self.model_stats[model_type]["initialization_time"] = duration
+    def record_initialization(self, model_type: str, duration_ns: int):
+        self.initialization_times[model_type] = duration_ns
+        getattr(self, model_type).init_time_ns = duration_ns
 
     def record_error(self, model_type: str):
-        self.model_stats[model_type]["errors"] += 1
+        getattr(self, model_type).errors += 1
 
     def get_metrics(self) -> Dict[str, Any]:
         return {
-            "uptime": time.time() - self.start_time,
-            "initialization_times": self.initialization_times,
-            "model_stats": self.model_stats
+            "uptime": (time.monotonic_ns() - self.start_time) / 1e9,
+            "initialization_times": {
+                model_type: duration_ns / 1e9
+                for model_type, duration_ns in self.initialization_times.items()
+            },
+            "model_stats": {
+                model_type: {"initialization_time": stat.init_time_ns / 1e9, "errors": stat.errors}
+                for model_type, stat in (("llm", self.llm), ("embedding", self.embedding))
+            }
         }
 
 config_metrics = ConfigMetrics()
@@ -101,7 +117,9 @@ WORKFLOW_CONFIG = {
     "max_retries": 3,
     "timeout_seconds": 30,
     "batch_size": 5,
-    "max_concurrent_tasks": 3
+    "max_concurrent_tasks": int(os.getenv("AGENT_MAX_CONCURRENCY", "3")),
+    "max_concurrent_tools": int(os.getenv("TOOL_MAX_CONCURRENCY", "8")),
+    "queue_max": int(os.getenv("MESSAGE_QUEUE_MAX", "10000"))
 }
 
 # Tool Configuration
@@ -136,33 +154,40 @@ LEARNING_CONFIG = {
 }
 
 # Model Functions
+@functools.lru_cache(maxsize=1)
 def get_llm():
-    """Initialize and return LLM instance"""
-    start_time = time.time()
+    """Initialize and return the shared LLM instance (created on first call)"""
+    start_time = time.monotonic_ns()
     try:
         logger.info(f"Initializing LLM with model type: {DEFAULT_MODEL}")
         
+        # Provider packages are imported only for the selected backend
         if DEFAULT_MODEL == "nvidia" and os.getenv('NVIDIA_API_KEY'):
+            from llama_index.llms.nvidia import NVIDIA
             model = NVIDIA(
                 model="meta/llama3-70b-instruct", 
                 api_key=os.getenv('NVIDIA_API_KEY')
             )
         elif DEFAULT_MODEL == "openai" and os.getenv('OPENAI_API_KEY'):
+            from llama_index.llms.openai import OpenAI
             model = OpenAI(
                 model="gpt-4", 
                 api_key=os.getenv('OPENAI_API_KEY')
             )
         elif DEFAULT_MODEL == "anthropic" and os.getenv('ANTHROPIC_API_KEY'):
+            from llama_index.llms.anthropic import Anthropic
             model = Anthropic(
                 model="claude-3-sonnet", 
                 api_key=os.getenv('ANTHROPIC_API_KEY')
             )
         elif DEFAULT_MODEL == "google" and os.getenv('GOOGLE_API_KEY'):
+            from llama_index.llms.gemini import Gemini
             model = Gemini(
                 model="gemini-3", 
                 api_key=os.getenv('GOOGLE_API_KEY')
             )
         elif DEFAULT_MODEL == "together" and os.getenv('TOGETHER_API_KEY'):
+            from llama_index.llms.together import TogetherLLM
             model = TogetherLLM(
                 model="together-llm", 
                 api_key=os.getenv('TOGETHER_API_KEY')
@@ -172,9 +197,9 @@ def get_llm():
                 f"No valid LLM configuration found. Current model: {DEFAULT_MODEL}"
             )
         
-        initialization_time = time.time() - start_time
+        initialization_time = time.monotonic_ns() - start_time
         config_metrics.record_initialization("llm", initialization_time)
-        logger.info(f"LLM initialized in {initialization_time:.2f} seconds")
+        logger.info(f"LLM initialized in {initialization_time / 1e9:.2f} seconds")
         return model
         
     except Exception as e:
@@ -182,23 +207,29 @@ def get_llm():
         logger.error(f"Failed to initialize LLM: {str(e)}")
         raise
 
+@functools.lru_cache(maxsize=1)
 def get_embedding():
-    """Initialize and return embedding model instance"""
-    start_time = time.time()
+    """Initialize and return the shared embedding model instance (created on first call)"""
+    start_time = time.monotonic_ns()
     try:
         logger.info(f"Initializing embedding with type: {DEFAULT_EMBEDDING}")
         
+        # Provider packages are imported only for the selected backend;
+        # HuggingFace in particular pulls in torch and transformers
         if DEFAULT_EMBEDDING == "nvidia" and os.getenv('NVIDIA_API_KEY'):
+            from llama_index.embeddings.nvidia import NVIDIAEmbedding
             model = NVIDIAEmbedding(
                 model="NV-Embed-QA", 
                 api_key=os.getenv('NVIDIA_API_KEY')
             )
         elif DEFAULT_EMBEDDING == "openai" and os.getenv('OPENAI_API_KEY'):
+            from llama_index.embeddings.openai import OpenAIEmbedding
             model = OpenAIEmbedding(
                 model="text-embedding-3-small",
                 api_key=os.getenv('OPENAI_API_KEY')
             )
         elif DEFAULT_EMBEDDING == "huggingface":
+            from llama_index.embeddings.huggingface import HuggingFaceEmbedding
             model = HuggingFaceEmbedding(
                 model="sentence-transformers/all-MiniLM-L6-v2"
             )
@@ -207,9 +238,9 @@ def get_embedding():
                 f"No valid embedding configuration found. Current type: {DEFAULT_EMBEDDING}"
             )
         
-        initialization_time = time.time() - start_time
+        initialization_time = time.monotonic_ns() - start_time
         config_metrics.record_initialization("embedding", initialization_time)
-        logger.info(f"Embedding initialized in {initialization_time:.2f} seconds")
+        logger.info(f"Embedding initialized in {initialization_time / 1e9:.2f} seconds")
         return model
         
     except Exception as e:
@@ -229,20 +260,10 @@ def get_config_status() -> Dict[str, Any]:
         "metrics": config_metrics.get_metrics()
     }
 
-# Initialize models
-try:
-    logger.info("Starting global model initialization")
-    llm = get_llm()
-    embed_model = get_embedding()
-    logger.info("Successfully initialized all models")
-except Exception as e:
-    logger.critical(f"Failed to initialize models: {str(e)}")
-    raise
-
 # Export components
 __all__ = [
-    'llm', 
-    'embed_model', 
+    'get_llm',
+    'get_embedding',
     'get_config_status', 
     'config_metrics',
     'WORKFLOW_CONFIG',
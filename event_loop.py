@@ -1,31 +1,99 @@
 # event_loop.py
 import asyncio
 import logging
+import sys
+import threading
+import weakref
 from typing import Any
-import traceback
 from contextlib import asynccontextmanager
 
 logger = logging.getLogger(__name__)
 DEBUG = False
 
+# Event loop reused by every run_async call on a thread. Streamlit runs
+# each session's script on its own thread, so a per-thread loop is never
+# driven from two sessions at once. Loops are tracked for cleanup().
+_thread_loops = threading.local()
+_loops: "weakref.WeakSet[asyncio.AbstractEventLoop]" = weakref.WeakSet()
+# Live tasks of each tracked loop, maintained by its task factory so
+# cleanup never has to scan asyncio.all_tasks()
+_loop_tasks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, set]" = weakref.WeakKeyDictionary()
+
 
 def debug_log(msg: str, data: Any = None):
-    if DEBUG:
-        call_frame = traceback.extract_stack()[-2]
-        calling_func = call_frame.name
-        if data:
-            logger.debug(f"[{calling_func}] {msg} | Data: {data}")
-        else:
-            logger.debug(f"[{calling_func}] {msg}")
+    if not DEBUG or not logger.isEnabledFor(logging.DEBUG):
+        return
+    calling_func = sys._getframe(1).f_code.co_name
+    if data:
+        logger.debug("[%s] %s | Data: %s", calling_func, msg, data)
+    else:
+        logger.debug("[%s] %s", calling_func, msg)
 
 
-def run_async(coroutine):
-    """Run async code in Streamlit with proper event loop handling"""
-    debug_log("Running async coroutine")
+def install_uvloop() -> bool:
+    """Use uvloop for new event loops when it is installed; returns True if enabled"""
+    if sys.platform == "win32":
+        return False
     try:
+        import uvloop
+    except ImportError:
+        debug_log("uvloop not installed, using the default event loop")
+        return False
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    debug_log("Installed uvloop event loop policy")
+    return True
+
+
+def _install_task_tracking(loop: asyncio.AbstractEventLoop):
+    """Record every task created on the loop until it finishes"""
+    tasks = _loop_tasks[loop] = set()
+
+    def task_factory(loop, coro, **kwargs):
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return task
+
+    loop.set_task_factory(task_factory)
+
+
+def _pending_tasks(loop: asyncio.AbstractEventLoop) -> list:
+    """Unfinished tasks created on a tracked loop"""
+    return [task for task in _loop_tasks.get(loop, ()) if not task.done()]
+
+
+def _get_or_create_loop() -> asyncio.AbstractEventLoop:
+    """Return this thread's event loop, creating it on first use"""
+    loop = getattr(_thread_loops, "loop", None)
+    if loop is None or loop.is_closed():
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
+        _thread_loops.loop = loop
+        _loops.add(loop)
+        _install_task_tracking(loop)
+        debug_log("Created event loop")
+    return loop
+
+
+def _cancel_pending(loop: asyncio.AbstractEventLoop):
+    """Cancel tasks left on the loop and wait for them to finish"""
+    pending = _pending_tasks(loop)
+    if not pending:
+        return
+
+    for task in pending:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
 
+
+def run_async(coroutine):
+    """Run async code in Streamlit on the thread's reusable event loop"""
+    debug_log("Running async coroutine")
+    loop = _get_or_create_loop()
+    # A nested call (via nest_asyncio) must not cancel the outer call's tasks
+    nested = loop.is_running()
+    try:
         return loop.run_until_complete(
             asyncio.wait_for(coroutine, timeout=60)
         )
@@ -36,30 +104,23 @@ def run_async(coroutine):
         debug_log(f"Async execution failed: {str(e)}")
         raise
     finally:
-        try:
-            pending = asyncio.all_tasks(loop)
-            for task in pending:
-                task.cancel()
-
-            if pending:
-                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
-
-            loop.close()
-        except Exception as e:
-            debug_log(f"Error during cleanup: {str(e)}")
+        # Leave the loop open for the next call; it is closed by cleanup()
+        if not nested:
+            try:
+                _cancel_pending(loop)
+            except Exception as e:
+                debug_log(f"Error during cleanup: {str(e)}")
 
 
 def cleanup():
     """Clean up system resources safely"""
     debug_log("Performing system cleanup")
-    try:
+    for loop in list(_loops):
         try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            return
+            if loop.is_closed() or loop.is_running():
+                continue
 
-        if not loop.is_closed():
-            pending = [task for task in asyncio.all_tasks(loop) if not task.done()]
+            pending = _pending_tasks(loop)
             if pending:
                 async def cancel_tasks():
                     for task in pending:
@@ -70,11 +131,10 @@ def cleanup():
                     loop.run_until_complete(asyncio.wait_for(cancel_tasks(), timeout=1.0))
                 except Exception:
                     pass
-                finally:
-                    if not loop.is_closed():
-                        loop.close()
-    except Exception as e:
-        debug_log(f"Cleanup error: {str(e)}")
+
+            loop.close()
+        except Exception as e:
+            debug_log(f"Cleanup error: {str(e)}")
 
 
 async def init_event_loop():
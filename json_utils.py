@@ -0,0 +1,39 @@
+# json_utils.py
+import json
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib json module
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so this catches
+# decode errors from either backend
+JSONDecodeError = json.JSONDecodeError
+
+if orjson is not None:
+    def dumps(obj: Any, indent: bool = False, default: Optional[Callable] = None) -> str:
+        """Serialize obj to a JSON string, optionally indented by two spaces"""
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option).decode()
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """Serialize obj to UTF-8 encoded JSON"""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    loads = orjson.loads
+else:
+    def dumps(obj: Any, indent: bool = False, default: Optional[Callable] = None) -> str:
+        """Serialize obj to a JSON string, optionally indented by two spaces"""
+        return json.dumps(obj, default=default, indent=2 if indent else None)
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """Serialize obj to UTF-8 encoded JSON"""
+        return json.dumps(obj).encode()
+
+    # Accepts str as well as UTF-8 bytes
+    loads = json.loads
+
+__all__ = ['dumps', 'dumps_bytes', 'loads', 'JSONDecodeError']
@@ -5,7 +5,7 @@ import atexit
 from typing import Dict, Any
 import logging
 
-from event_loop import run_async, cleanup, init_event_loop
+from event_loop import run_async, cleanup, init_event_loop, install_uvloop
 from state_management import (
     initialize_session_state, add_message, format_tools_for_llm,
     reset_system
@@ -23,8 +23,10 @@ from state import StateManager
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
-# Apply nest_asyncio
-nest_asyncio.apply()
+# Prefer uvloop; nest_asyncio can only patch the stock asyncio loop,
+# so it is applied only when falling back to it
+if not install_uvloop():
+    nest_asyncio.apply()
 
 # Initialize session state
 initialize_session_state()
@@ -49,14 +51,17 @@ user_input, submit_button, stop_button = render_input_area()
 
 # Process user input
 if submit_button and user_input:
+    generator = None
     try:
         add_message("user", user_input)
 
         with st.spinner("Initializing system..."):
             # Initialize components
+            tool_registry = ToolRegistry()
+            tool_registry.freeze()
             generator = AgentGenerator(
                 st.session_state.user_id,
-                ToolRegistry(),
+                tool_registry,
                 StateManager("agents.db")
             )
             tools_description = format_tools_for_llm()
@@ -106,6 +111,10 @@ if submit_button and user_input:
         logger.error(error_msg)
         st.error(error_msg)
         add_message("system", f"Error: {str(e)}")
+    finally:
+        # Release the state manager's database connection
+        if generator is not None:
+            run_async(generator.state_manager.aclose())
 
 # Handle stop button
 if stop_button:
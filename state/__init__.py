@@ -35,7 +35,8 @@ def create_state_manager(
     
     if _global_state_manager is None:
         _global_state_manager = StateManager(
-            db_path or DEFAULT_CONFIG['db_path']
+            db_path or DEFAULT_CONFIG['db_path'],
+            cache_size=DEFAULT_CONFIG['cache_size'] if DEFAULT_CONFIG['enable_cache'] else 0
         )
     
     return _global_state_manager
@@ -1,12 +1,13 @@
 # state/state_manager.py
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, Optional
-import aiosqlite
-import json
+from typing import Dict, Any, Optional, Tuple, Union
+import sqlite3
 import logging
 import asyncio
-from contextlib import asynccontextmanager
+import threading
+from collections import OrderedDict
+import json_utils
 
 logger = logging.getLogger(__name__)
 
@@ -17,70 +18,314 @@ class AgentState:
     current_step: Optional[str]
     tools_state: Dict[str, Any]
     shared_data: Dict[str, Any]
-    last_updated: datetime
+    # States read back from the database keep the stored ISO string;
+    # use last_updated_dt() / last_updated_iso() for a fixed type
+    last_updated: Union[datetime, str]
     status: str
     step_results: Dict[str, Any]
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert state to dictionary"""
         return {
-            **asdict(self),
-            "last_updated": self.last_updated.isoformat()
+            "agent_id": self.agent_id,
+            "user_id": self.user_id,
+            "current_step": self.current_step,
+            "tools_state": self.tools_state,
+            "shared_data": self.shared_data,
+            "last_updated": self.last_updated_iso(),
+            "status": self.status,
+            "step_results": self.step_results
         }
     
+    def last_updated_dt(self) -> datetime:
+        """last_updated as a datetime, parsing a stored string once"""
+        last_updated = self.last_updated
+        if isinstance(last_updated, str):
+            last_updated = self.last_updated = datetime.fromisoformat(last_updated)
+        return last_updated
+    
+    def last_updated_iso(self) -> str:
+        """last_updated as an ISO string, without parsing a stored string"""
+        last_updated = self.last_updated
+        return last_updated if isinstance(last_updated, str) else last_updated.isoformat()
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'AgentState':
         """Create state from dictionary"""
+        return cls(**data)
+    
+    @classmethod
+    def from_row(cls, row) -> 'AgentState':
+        """Create state from a row in _SELECT_STATE_SQL column order, whose
+        JSON columns the JSON converter has already decoded"""
         return cls(
-            **{
-                **data,
-                "last_updated": datetime.fromisoformat(
-                    data["last_updated"] if isinstance(data["last_updated"], str)
-                    else data["last_updated"].isoformat()
-                )
-            }
+            agent_id=row[0],
+            user_id=row[1],
+            current_step=row[2],
+            tools_state=row[3],
+            shared_data=row[4],
+            last_updated=row[5],
+            status=row[6],
+            step_results=row[7]
         )
 
+# Columns aliased as "name [JSON]" are decoded by this converter while
+# sqlite3 builds the row (the connection uses PARSE_COLNAMES)
+sqlite3.register_converter("JSON", json_utils.loads)
+
+# SQL text is kept identical across calls so the connection's statement
+# cache (sqlite3 caches prepared statements by query string) hits
+_SELECT_STATE_SQL = """
+    SELECT agent_id, user_id, current_step,
+           tools_state AS "tools_state [JSON]",
+           shared_data AS "shared_data [JSON]",
+           last_updated, status,
+           step_results AS "step_results [JSON]"
+    FROM agent_states 
+    WHERE agent_id = ? AND user_id = ?
+"""
+_SELECT_STATUS_SQL = """
+    SELECT status, current_step FROM agent_states 
+    WHERE agent_id = ? AND user_id = ?
+"""
+_UPSERT_STATE_SQL = """
+    INSERT OR REPLACE INTO agent_states 
+    (agent_id, user_id, current_step, tools_state, shared_data, 
+     last_updated, status, step_results)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_DELETE_STATE_SQL = "DELETE FROM agent_states WHERE agent_id = ? AND user_id = ?"
+_CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS agent_states (
+        agent_id TEXT,
+        user_id TEXT,
+        current_step TEXT,
+        tools_state BLOB,
+        shared_data BLOB,
+        last_updated TIMESTAMP,
+        status TEXT,
+        step_results BLOB,
+        PRIMARY KEY (agent_id, user_id)
+    )
+"""
+# For listing a user's most recently updated states
+_CREATE_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_user_updated
+    ON agent_states (user_id, last_updated DESC)
+"""
+
+# Writes are coalesced for this long before being committed together
+_FLUSH_DELAY = 0.01
+# update_state flushes inline once this many states are pending
+_FLUSH_MAX_PENDING = 500
+
+def _state_to_row(state: AgentState) -> Tuple:
+    """Serialize a state into an agent_states row; JSON columns are stored
+    as BLOBs of UTF-8 JSON, older TEXT values still load"""
+    return (
+        state.agent_id,
+        state.user_id,
+        state.current_step,
+        json_utils.dumps_bytes(state.tools_state),
+        json_utils.dumps_bytes(state.shared_data),
+        state.last_updated_iso(),
+        state.status,
+        json_utils.dumps_bytes(state.step_results)
+    )
+
+def _state_from_encoded(row: Tuple) -> AgentState:
+    """Rebuild a state from a _state_to_row row, whose JSON columns are still encoded"""
+    loads = json_utils.loads
+    return AgentState.from_row(
+        (*row[:3], loads(row[3]), loads(row[4]), row[5], row[6], loads(row[7]))
+    )
+
 class StateManager:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, cache_size: int = 1024):
         self.db_path = db_path
-        self._setup_done = False
-        self._lock = asyncio.Lock()
-    
-    @asynccontextmanager
-    async def _get_db(self):
-        """Get database connection with automatic setup"""
-        if not self._setup_done:
-            async with self._lock:
-                if not self._setup_done:
+        # Opened on first use and kept until aclose(). Queries run in
+        # worker threads via asyncio.to_thread; _db_lock serializes them.
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        
+        # Rows waiting to be written, keyed by (agent_id, user_id) so only
+        # the latest update of each state is kept
+        self._pending: Dict[Tuple[str, str], Tuple] = {}
+        # Rows of the batch being written, readable until it commits
+        self._inflight: Dict[Tuple[str, str], Tuple] = {}
+        # asyncio primitives are bound to one event loop, so _bind_loop()
+        # recreates them when the manager is used from a different loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Serializes opening the database
+        self._setup_lock: Optional[asyncio.Lock] = None
+        # Orders batch writes and deletes
+        self._flush_lock: Optional[asyncio.Lock] = None
+        # Background flusher and the event that wakes it
+        self._flush_event: Optional[asyncio.Event] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+        
+        # LRU of committed rows by (agent_id, user_id), in _state_to_row
+        # form; each hit builds a fresh state. 0 disables it.
+        self._cache: "OrderedDict[Tuple[str, str], Tuple]" = OrderedDict()
+        self._cache_size = cache_size
+    
+    def _cache_put(self, key: Tuple[str, str], row: Tuple):
+        """Cache a committed row, evicting least recently used entries"""
+        if self._cache_size <= 0:
+            return
+        self._cache[key] = row
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+    
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        """Return the running loop, creating fresh locks and dropping the
+        flusher if the manager was last used from another loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._setup_lock = asyncio.Lock()
+            self._flush_lock = asyncio.Lock()
+            self._flush_event = None
+            self._flusher_task = None
+        return loop
+    
+    async def _ensure_ready(self):
+        """Open the database on first use"""
+        if self._conn is None:
+            self._bind_loop()
+            async with self._setup_lock:
+                if self._conn is None:
                     await self._setup_database()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection and apply its settings.
         
-        async with aiosqlite.connect(self.db_path) as db:
-            yield db
+        WAL with synchronous=NORMAL skips the fsync on each commit; the
+        database stays consistent and a crash of the app loses nothing,
+        only a power loss can drop the last committed transactions. WAL
+        mode persists in the file, the other PRAGMAs are per connection.
+        """
+        # Autocommit mode; batch writes open their own transaction
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None,
+            detect_types=sqlite3.PARSE_COLNAMES
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-20000")
+        conn.execute(_CREATE_TABLE_SQL)
+        conn.execute(_CREATE_INDEX_SQL)
+        return conn
+    
+    def _fetchone(self, sql: str, params: Tuple):
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchone()
+    
+    def _execute(self, sql: str, params: Tuple):
+        with self._db_lock:
+            self._conn.execute(sql, params)
+    
+    def _write_batch(self, rows):
+        """Upsert rows in one transaction; rows may be any iterable of tuples"""
+        with self._db_lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(_UPSERT_STATE_SQL, rows)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
     
     async def _setup_database(self):
         """Initialize the SQLite database"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute("""
-                    CREATE TABLE IF NOT EXISTS agent_states (
-                        agent_id TEXT,
-                        user_id TEXT,
-                        current_step TEXT,
-                        tools_state TEXT,
-                        shared_data TEXT,
-                        last_updated TIMESTAMP,
-                        status TEXT,
-                        step_results TEXT,
-                        PRIMARY KEY (agent_id, user_id)
-                    )
-                """)
-                await db.commit()
-            self._setup_done = True
+            if self._conn is None:
+                self._conn = await asyncio.to_thread(self._connect)
         except Exception as e:
             logger.error(f"Database setup failed: {str(e)}")
             raise
     
+    def _schedule_flush(self):
+        """Wake the flusher, starting one on the running loop if needed"""
+        loop = self._bind_loop()
+        task = self._flusher_task
+        if task is None or task.done():
+            self._flush_event = asyncio.Event()
+            self._flusher_task = loop.create_task(self._flusher(self._flush_event))
+        self._flush_event.set()
+    
+    async def _flusher(self, event: asyncio.Event):
+        """Commit pending writes in batches; flushes what is left when cancelled"""
+        try:
+            while True:
+                await event.wait()
+                # Let a burst of updates accumulate into one transaction
+                await asyncio.sleep(_FLUSH_DELAY)
+                event.clear()
+                try:
+                    await self.flush()
+                except Exception:
+                    # Already logged; the rows stay pending for the next flush
+                    pass
+        except asyncio.CancelledError:
+            await self.flush()
+            raise
+    
+    async def flush(self):
+        """Write all pending state updates in a single transaction"""
+        self._bind_loop()
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch = self._pending
+            self._pending = {}
+            self._inflight = batch
+            try:
+                await self._ensure_ready()
+                # One thread hop per batch, not per row. The batch dict is
+                # no longer written to, so its values stream straight into
+                # executemany without being copied into a list.
+                await asyncio.to_thread(self._write_batch, batch.values())
+                for key, row in batch.items():
+                    self._cache_put(key, row)
+            except Exception as e:
+                # Requeue rows that were not superseded in the meantime
+                for key, row in batch.items():
+                    self._pending.setdefault(key, row)
+                logger.error(f"Failed to flush states: {str(e)}")
+                raise
+            finally:
+                self._inflight = {}
+    
+    async def aclose(self):
+        """Flush pending writes and close the database connection; it is
+        reopened on next use"""
+        self._bind_loop()
+        task = self._flusher_task
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._flusher_task = None
+        await self.flush()
+        
+        async with self._setup_lock:
+            if self._conn is not None:
+                await asyncio.to_thread(self._close)
+    
+    def _close(self):
+        with self._db_lock:
+            # Cheap; only re-analyzes tables whose statistics look stale
+            self._conn.execute("PRAGMA optimize")
+            self._conn.close()
+            self._conn = None
+    
     async def create_state(self, **kwargs) -> AgentState:
         """Create a new agent state"""
         state = AgentState(**kwargs)
@@ -88,70 +333,79 @@ class StateManager:
         return state
     
     async def get_state(self, agent_id: str, user_id: str) -> Optional[AgentState]:
-        """Retrieve agent state from database"""
+        """Retrieve agent state, including writes not yet flushed.
+        
+        Every call returns a new state object; changes to it are only seen
+        by later reads once passed to update_state.
+        """
+        key = (agent_id, user_id)
+        row = self._pending.get(key) or self._inflight.get(key)
+        if row is not None:
+            return _state_from_encoded(row)
+        
+        row = self._cache.get(key)
+        if row is not None:
+            self._cache.move_to_end(key)
+            return _state_from_encoded(row)
+        
         try:
-            async with self._get_db() as db:
-                async with db.execute(
-                    """
-                    SELECT * FROM agent_states 
-                    WHERE agent_id = ? AND user_id = ?
-                    """, 
-                    (agent_id, user_id)
-                ) as cursor:
-                    row = await cursor.fetchone()
-                    
-                    if row:
-                        return AgentState(
-                            agent_id=row[0],
-                            user_id=row[1],
-                            current_step=row[2],
-                            tools_state=json.loads(row[3]),
-                            shared_data=json.loads(row[4]),
-                            last_updated=datetime.fromisoformat(row[5]),
-                            status=row[6],
-                            step_results=json.loads(row[7])
-                        )
+            await self._ensure_ready()
+            row = await asyncio.to_thread(self._fetchone, _SELECT_STATE_SQL, key)
+            if row:
+                state = AgentState.from_row(row)
+                self._cache_put(key, _state_to_row(state))
+                return state
             return None
         except Exception as e:
             logger.error(f"Failed to get state: {str(e)}")
             raise
 
+    async def get_status_only(self, agent_id: str, user_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Return (status, current_step) without decoding the JSON columns"""
+        key = (agent_id, user_id)
+        row = self._pending.get(key) or self._inflight.get(key) or self._cache.get(key)
+        if row is not None:
+            return row[6], row[2]
+        
+        try:
+            await self._ensure_ready()
+            return await asyncio.to_thread(
+                self._fetchone, _SELECT_STATUS_SQL, (agent_id, user_id)
+            )
+        except Exception as e:
+            logger.error(f"Failed to get state status: {str(e)}")
+            raise
+
     async def update_state(self, state: AgentState):
-        """Update agent state in database"""
+        """Queue an agent state update.
+        
+        The state is serialized immediately and written by the background
+        flusher; await flush() when the write must be durable on return.
+        """
+        key = (state.agent_id, state.user_id)
         try:
-            async with self._get_db() as db:
-                await db.execute(
-                    """
-                    INSERT OR REPLACE INTO agent_states 
-                    (agent_id, user_id, current_step, tools_state, shared_data, 
-                     last_updated, status, step_results)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        state.agent_id,
-                        state.user_id,
-                        state.current_step,
-                        json.dumps(state.tools_state),
-                        json.dumps(state.shared_data),
-                        state.last_updated.isoformat(),
-                        state.status,
-                        json.dumps(state.step_results)
-                    )
-                )
-                await db.commit()
+            self._pending[key] = _state_to_row(state)
         except Exception as e:
             logger.error(f"Failed to update state: {str(e)}")
             raise
+        
+        if len(self._pending) >= _FLUSH_MAX_PENDING:
+            await self.flush()
+        else:
+            self._schedule_flush()
     
     async def delete_state(self, agent_id: str, user_id: str):
         """Delete agent state from database"""
+        self._pending.pop((agent_id, user_id), None)
+        self._cache.pop((agent_id, user_id), None)
         try:
-            async with self._get_db() as db:
-                await db.execute(
-                    "DELETE FROM agent_states WHERE agent_id = ? AND user_id = ?",
-                    (agent_id, user_id)
-                )
-                await db.commit()
+            await self._ensure_ready()
+            self._bind_loop()
+            # Behind any batch in flight, which may still hold this state
+            async with self._flush_lock:
+                await asyncio.to_thread(self._execute, _DELETE_STATE_SQL, (agent_id, user_id))
+                # A batch that committed while we waited may have cached it
+                self._cache.pop((agent_id, user_id), None)
         except Exception as e:
             logger.error(f"Failed to delete state: {str(e)}")
             raise
@@ -2,22 +2,31 @@
 import streamlit as st
 from datetime import datetime
 from typing import Dict, Any, Optional
-import json
 import logging
+import sys
+import time
 import uuid
-import traceback
+import json_utils
 
 logger = logging.getLogger(__name__)
 DEBUG = False
 
 def debug_log(msg: str, data: Any = None):
-    if DEBUG:
-        call_frame = traceback.extract_stack()[-2]
-        calling_func = call_frame.name
-        if data:
-            logger.debug(f"[{calling_func}] {msg} | Data: {json.dumps(data, default=str, indent=2)}")
-        else:
-            logger.debug(f"[{calling_func}] {msg}")
+    if not DEBUG or not logger.isEnabledFor(logging.DEBUG):
+        return
+    calling_func = sys._getframe(1).f_code.co_name
+    if data:
+        logger.debug("[%s] %s | Data: %s", calling_func, msg, json_utils.dumps(data, indent=True, default=str))
+    else:
+        logger.debug("[%s] %s", calling_func, msg)
+
+def _now_ms() -> int:
+    """Current wall-clock time as integer milliseconds"""
+    return time.time_ns() // 1_000_000
+
+def fmt_ts(ms: int) -> str:
+    """Format a millisecond timestamp for display"""
+    return datetime.fromtimestamp(ms / 1000).isoformat()
 
 def initialize_session_state():
     """Initialize all session state variables"""
@@ -33,6 +42,9 @@ def initialize_session_state():
         st.session_state.current_task = None
     if 'available_tools' not in st.session_state:
         st.session_state.available_tools = {}
+    if 'tools_prompt_cache' not in st.session_state:
+        # Last format_tools_for_llm result, keyed by the serialized tools
+        st.session_state.tools_prompt_cache = (None, "")
 
 def add_message(role: str, content: str, agent_name: Optional[str] = None):
     """Add a message to the chat history."""
@@ -46,7 +58,7 @@ def add_message(role: str, content: str, agent_name: Optional[str] = None):
             "role": role,
             "content": content,
             "agent": agent_name,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _now_ms()
         })
     except Exception as e:
         debug_log(f"Error adding message: {str(e)}")
@@ -63,7 +75,7 @@ def show_agent_status(agent_name: str, status: str, progress: float):
         st.session_state.execution_status[agent_name] = {
             "status": status,
             "progress": progress,
-            "last_update": datetime.now().isoformat()
+            "last_update": _now_ms()
         }
     except Exception as e:
         debug_log(f"Error updating agent status: {str(e)}")
@@ -81,15 +93,24 @@ def format_tools_for_llm() -> str:
     """Format available tools into a string for LLM prompt."""
     debug_log("Formatting tools for LLM")
     try:
-        tools_description = "Available tools:\n\n"
-        for tool_name, tool_info in st.session_state.available_tools.items():
-            tools_description += f"""
-Tool: {tool_name}
-Description: {tool_info['description']}
-Parameters: {json.dumps(tool_info['parameters'], indent=2)}
-Return Type: {tool_info['return_type']}
----
-"""
+        tools = st.session_state.available_tools
+        # Keyed on content so in-place edits to the tools are picked up
+        signature = json_utils.dumps(tools, default=str)
+        cached_signature, cached_description = st.session_state.get("tools_prompt_cache", (None, ""))
+        if signature == cached_signature:
+            return cached_description
+        
+        parts = ["Available tools:\n\n"]
+        for tool_name, tool_info in tools.items():
+            parts.append(
+                f"\nTool: {tool_name}\n"
+                f"Description: {tool_info['description']}\n"
+                f"Parameters: {json_utils.dumps(tool_info['parameters'], indent=True)}\n"
+                f"Return Type: {tool_info['return_type']}\n"
+                "---\n"
+            )
+        tools_description = "".join(parts)
+        st.session_state.tools_prompt_cache = (signature, tools_description)
         return tools_description
     except Exception as e:
         debug_log(f"Error formatting tools: {str(e)}")
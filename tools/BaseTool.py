@@ -30,13 +30,15 @@ class BaseTool(ABC):
     
     async def safe_execute(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Safely execute the tool with validation and error handling"""
+        # Sampled once; used for both the execution and any error timestamp
+        now = datetime.now()
         try:
             # Validate parameters
             if not await self._validate_params(params):
                 raise ToolExecutionError("Missing required parameters")
             
             # Set execution context
-            self._last_execution = datetime.now()
+            self._last_execution = now
             self._execution_count += 1
             
             # Execute tool
@@ -72,7 +74,7 @@ class BaseTool(ABC):
                 "error": str(e),
                 "stack_trace": stack_trace,
                 "state": {
-                    "last_error": datetime.now().isoformat(),
+                    "last_error": now.isoformat(),
                     "error_count": self._error_count
                 }
             }
@@ -1,8 +1,8 @@
 # tools/registry.py
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, FrozenSet, Sequence
+from types import MappingProxyType
 from datetime import datetime
 import logging
-import json
 from .BaseTool import BaseTool, ToolExecutionError
 
 logger = logging.getLogger(__name__)
@@ -23,6 +23,10 @@ class ToolValidationError(RegistryError):
     """Raised when a tool fails validation"""
     pass
 
+class RegistryFrozenError(RegistryError):
+    """Raised when modifying a registry after freeze()"""
+    pass
+
 class ToolRegistry:
     def __init__(self, persistence_path: Optional[str] = None):
         # Tool storage
@@ -31,7 +35,7 @@ class ToolRegistry:
         self._categories: Dict[str, List[str]] = {}
         
         # Define available tools
-        self._available_tools = [
+        self._available_tools: Sequence[str] = [
             "web_search",
             "API_caller",
             "LLM_model",
@@ -40,6 +44,10 @@ class ToolRegistry:
             "feedback_tool",
             "db_tool"
         ]
+        self._available_tool_set: FrozenSet[str] = frozenset(self._available_tools)
+        
+        # Set by freeze(); read paths then serve immutable snapshots
+        self._frozen = False
         
         # Persistence
         self._persistence_path = persistence_path
@@ -47,7 +55,7 @@ class ToolRegistry:
         
         logger.info(f"Initialized ToolRegistry with {len(self._available_tools)} available tools")
     
-    async def get_available_tools(self) -> List[str]:
+    async def get_available_tools(self) -> Sequence[str]:
         """Get list of available tools"""
         return self._available_tools
     
@@ -55,16 +63,28 @@ class ToolRegistry:
         """Get a tool by name"""
         return self._tools.get(name)
     
-    def list_tools(self) -> List[str]:
+    def list_tools(self) -> Sequence[str]:
         """List all registered tools"""
         return self._available_tools
 
+    def freeze(self) -> None:
+        """Snapshot the registered tools and reject further changes"""
+        if self._frozen:
+            return
+        self._tools = MappingProxyType(dict(self._tools))
+        self._available_tools = tuple(self._available_tools)
+        self._frozen = True
+        logger.info(f"Froze ToolRegistry with {len(self._tools)} registered tools")
+
     def register_tool(self, tool: BaseTool) -> None:
         """Register a tool in the registry"""
+        if self._frozen:
+            raise RegistryFrozenError(f"Cannot register '{tool.name}': registry is frozen")
+        
         if tool.name in self._tools:
             raise ToolAlreadyRegisteredError(f"Tool '{tool.name}' is already registered")
         
-        if tool.name not in self._available_tools:
+        if tool.name not in self._available_tool_set:
             logger.warning(f"Registering unknown tool: {tool.name}")
             
         self._tools[tool.name] = tool
@@ -77,6 +97,9 @@ class ToolRegistry:
 
     def unregister_tool(self, name: str) -> bool:
         """Unregister a tool"""
+        if self._frozen:
+            raise RegistryFrozenError(f"Cannot unregister '{name}': registry is frozen")
+        
         if name in self._tools:
             del self._tools[name]
             if name in self._tool_metadata:
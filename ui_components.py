@@ -2,6 +2,8 @@
 import streamlit as st
 from typing import Dict, List, Any
 
+from state_management import fmt_ts
+
 
 def setup_page():
     """Setup the main page configuration"""
@@ -34,23 +36,28 @@ def render_sidebar():
                 with st.expander(f"Agent: {agent_name}"):
                     st.progress(status["progress"])
                     st.write(f"Status: {status['status']}")
-                    st.write(f"Last Update: {status['last_update']}")
+                    st.write(f"Last Update: {fmt_ts(status['last_update'])}")
 
         return st.button("Reset System")
 
 
+def _render_message(msg: Dict[str, Any]):
+    """Render a single chat message"""
+    if msg["role"] == "user":
+        st.write(f"👤 You: {msg['content']}")
+    elif msg["role"] == "agent":
+        with st.chat_message("assistant", avatar="🤖"):
+            st.write(f"**{msg['agent']}**: {msg['content']}")
+    else:
+        st.write(f"💻 System: {msg['content']}")
+    st.caption(f"Time: {fmt_ts(msg['timestamp'])}")
+
+
 def render_chat_history(chat_container):
     """Render the chat history"""
     with chat_container:
         for msg in st.session_state.messages:
-            if msg["role"] == "user":
-                st.write(f"👤 You: {msg['content']}")
-            elif msg["role"] == "agent":
-                with st.chat_message("assistant", avatar="🤖"):
-                    st.write(f"**{msg['agent']}**: {msg['content']}")
-            else:
-                st.write(f"💻 System: {msg['content']}")
-            st.caption(f"Time: {msg['timestamp']}")
+            _render_message(msg)
 
 
 def render_input_area():